@@ -59,6 +59,7 @@ namespace SiphogLib {
         void clientThreadFunction();
 
         // Data processing
+        // Messages are one CSV line each; clients frame them on the trailing newline
         std::string formatDataMessage(const SiphogMessageModel& message);
         void processAndSendMessage(const SiphogMessageModel& message);
 
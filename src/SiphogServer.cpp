@@ -189,7 +189,7 @@ namespace SiphogLib {
         oss << message.sledTemp << ",";         // SLED_Temp (C)
         oss << targetSagPowerV << ",";          // Target SAG_PWR (V)
         oss << message.sagPowerV << ",";        // SAG_PWR (V)
-        oss << message.tecCurrent;              // TEC_Current (mA) - no comma at end
+        oss << message.tecCurrent << "\n";      // TEC_Current (mA) - newline terminates the message
 
         return oss.str();
     }
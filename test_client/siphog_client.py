@@ -2,50 +2,174 @@
 """
 Smooth Python client for SiPhOG TCP server - no blinking!
 Updates display in-place without screen clearing
+
+Each message from the server is one line of six comma-separated values
+terminated by '\n'; messages without the newline are never processed.
 """
 
 import socket
 import time
 import sys
 import os
-from datetime import datetime
-from collections import deque
+import selectors
+from array import array
+
+# On a Windows console, position and write fields with the native console
+# API rather than relying on the (slow or missing) ANSI escape emulation
+_WIN_CONSOLE = False
+if os.name == 'nt':
+    import ctypes
+    from ctypes import wintypes
+    
+    class _COORD(ctypes.Structure):
+        _fields_ = [("X", wintypes.SHORT), ("Y", wintypes.SHORT)]
+    
+    _k32 = ctypes.windll.kernel32
+    _k32.GetStdHandle.restype = wintypes.HANDLE
+    _k32.GetConsoleMode.argtypes = (wintypes.HANDLE, ctypes.POINTER(wintypes.DWORD))
+    _k32.SetConsoleCursorPosition.argtypes = (wintypes.HANDLE, _COORD)
+    _k32.WriteConsoleW.argtypes = (wintypes.HANDLE, wintypes.LPCWSTR, wintypes.DWORD,
+                                   ctypes.POINTER(wintypes.DWORD), wintypes.LPVOID)
+    _STDOUT = _k32.GetStdHandle(-11)  # STD_OUTPUT_HANDLE
+    
+    # The console calls fail when stdout is redirected; keep ANSI then
+    _WIN_CONSOLE = bool(_k32.GetConsoleMode(_STDOUT, ctypes.byref(wintypes.DWORD())))
+    _written = wintypes.DWORD()
+    
+    def _console_write_at(row, col, text):
+        """Write text at a 1-based screen position through the console API"""
+        _k32.SetConsoleCursorPosition(_STDOUT, _COORD(col - 1, row - 1))
+        # Length is in UTF-16 code units; emoji take two
+        _k32.WriteConsoleW(_STDOUT, text, len(text.encode('utf-16-le')) // 2,
+                           ctypes.byref(_written), None)
+
+# Kernel socket receive buffer and user-space receive buffer sizes
+SOCKET_RCVBUF = 1 << 20
+RECV_BUFFER_SIZE = 64 * 1024
+
+# How long the run loop waits for data before checking its state again
+SELECT_TIMEOUT = 0.1
+
+# Number of receive batches used for the rate estimate
+RATE_WINDOW = 50
+
+# Redraw the terminal at most ~30 times per second
+RENDER_INTERVAL = 0.033
+
+# Dynamic display fields in render order: (row, col, width)
+DISPLAY_FIELDS = (
+    (4, 8, 25),    # Time
+    (5, 10, 25),   # Server
+    (6, 12, 15),   # Messages
+    (6, 35, 15),   # Rate
+    (9, 18, 15),   # SLED Current
+    (10, 15, 15),  # SLED Temp
+    (11, 17, 15),  # TEC Current
+    (14, 19, 15),  # Photo Current
+    (15, 15, 15),  # SAG Power
+    (16, 19, 15),  # Target SAG PWR
+    (18, 16, 20),  # Status
+)
+
+# Cursor-move escape and width of each field, encoded once
+FIELD_LAYOUT = tuple((f"\033[{row};{col}H".encode('ascii'), width)
+                     for row, col, width in DISPLAY_FIELDS)
+
+# Number formatters for the data fields, bound once at import
+_F2 = "{:8.2f}".format
+_F4 = "{:8.4f}".format
+
+# ".000" to ".999" millisecond suffixes for the display timestamp
+_MS_SUFFIX = tuple(f".{ms:03d}" for ms in range(1000))
+
+# Data quality indicator, indexed by (rate > 10) + (rate > 30)
+_STATUS = ("🔴 Slow", "🟡 Good", "🟢 Excellent")
+
+# Static display layout, drawn once by init_display()
+_HEADER_LINES = (
+    "╔" + "═" * 58 + "╗",
+    "║" + " " * 15 + "🔬 SiPhOG Data Monitor" + " " * 20 + "║",
+    "╠" + "═" * 58 + "╣",
+    "║ Time:                                                  ║",
+    "║ Server:                                                ║",
+    "║ Messages:                    Rate:                     ║",
+    "╠" + "═" * 58 + "╣",
+    "║ 📊 LASER & CONTROL:                                    ║",
+    "║   SLED Current:                                   mA   ║",
+    "║   SLED Temp:                                      °C   ║",
+    "║   TEC Current:                                    mA   ║",
+    "║                                                        ║",
+    "║ ⚡ OPTICAL POWER:                                      ║",
+    "║   Photo Current:                                  µA   ║",
+    "║   SAG Power:                                      V    ║",
+    "║   Target SAG PWR:                                 V    ║",
+    "║                                                        ║",
+    "║ 📈 STATUS: Streaming...                                ║",
+    "║                                                        ║",
+    "║ 💡 Press Ctrl+C to stop                               ║",
+    "╚" + "═" * 58 + "╝",
+)
+_HEADER_TEXT = "\n".join(_HEADER_LINES) + "\n"
+_HEADER_BYTES = _HEADER_TEXT.encode('utf-8')
 
 class SmoothSiPhogClient:
     def __init__(self, host="127.0.0.1", port=65432):
         self.host = host
         self.port = port
         self.socket = None
+        self.selector = None
         self.running = False
         self.data_count = 0
         self.last_data_time = None
         self.start_time = None
         
-        # Rate calculation
-        self.rate_history = deque(maxlen=50)  # Last 50 timestamps
+        # Receive buffer, reused for every recv_into()
+        self._rxbuf = bytearray(RECV_BUFFER_SIZE)
+        self._rxview = memoryview(self._rxbuf)
+        
+        # Display frame buffer, refilled on every redraw
+        self._frame = bytearray()
+        self._outfd = None  # Raw stdout fd for frames, if used
         
-        # Data keys matching the server
-        self.data_keys = [
+        # Rate calculation: ring buffer of the last RATE_WINDOW batches, each
+        # stored as its receive time and the message count after it
+        self._ts = array('d', [0.0] * RATE_WINDOW)
+        self._ts_count = array('q', [0] * RATE_WINDOW)
+        self._ts_i = 0       # Next slot to write
+        self._ts_filled = 0  # Number of valid slots
+        
+        # Data keys matching the server, in message field order
+        self.data_keys = (
             "SLED_Current (mA)",
             "Photo Current (uA)", 
             "SLED_Temp (C)",
             "Target SAG_PWR (V)",
             "SAG_PWR (V)",
             "TEC_Current (mA)"
-        ]
+        )
         
         # Current data storage
         self.current_data = {}
+        self._values = array('d', [0.0] * 6)  # Reused by every parse_data()
         self.display_initialized = False
+        self._latest = None       # Most recent parsed values
+        self._last_render = 0.0   # time.monotonic() of the last redraw
+        self._redraw_pending = False  # Recorded data not yet on screen
+        self._last_sec = -1       # Whole second the cached HH:MM:SS is for
+        self._last_hms = ""
         
     def connect(self):
         """Connect to the SiPhOG server"""
         try:
             self.socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
             self.socket.settimeout(5.0)
+            # Set before connect() so the TCP window scale is negotiated for it
+            self.socket.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, SOCKET_RCVBUF)
             print(f"🔌 Connecting to {self.host}:{self.port}...")
             self.socket.connect((self.host, self.port))
-            self.socket.settimeout(0.1)  # Short timeout for smooth updates
+            self.socket.settimeout(None)  # Blocking; readiness comes from the selector
+            self.selector = selectors.DefaultSelector()
+            self.selector.register(self.socket, selectors.EVENT_READ)
             print(f"✅ Connected! Starting data monitor...\n")
             return True
         except Exception as e:
@@ -55,33 +179,72 @@ class SmoothSiPhogClient:
     def disconnect(self):
         """Disconnect from the server"""
         self.running = False
+        if self.selector:
+            self.selector.close()
+            self.selector = None
         if self.socket:
             self.socket.close()
             self.socket = None
     
-    def parse_data(self, data_str):
-        """Parse CSV data from server"""
+    def parse_data(self, data_bytes):
+        """Parse CSV data from server into values ordered like data_keys
+        
+        The returned array is overwritten by the next successful call.
+        """
+        fields = data_bytes.split(b',')
+        if len(fields) != 6:
+            return None
+        
+        # float() accepts bytes and ignores surrounding whitespace; the
+        # unpack converts all six before storing any, so a bad field
+        # never leaves the array half-written
+        values = self._values
         try:
-            clean_data = data_str.strip()
-            if not clean_data:
-                return None
-                
-            values = [float(x.strip()) for x in clean_data.split(',')]
-            if len(values) == 6:
-                return dict(zip(self.data_keys, values))
-            else:
-                return None
-        except:
+            (values[0], values[1], values[2],
+             values[3], values[4], values[5]) = map(float, fields)
+        except ValueError:
             return None
+        return values
+    
+    def parse_all_lines(self, line_start, scan_off, end):
+        """Frame and parse every complete message in the buffer
+        
+        Messages are the newline-terminated lines in _rxbuf[line_start:end];
+        the newline search starts at scan_off since the bytes before it were
+        already searched. Returns (count, latest, offset): the number of valid
+        messages, the values of the last one and the offset of the first
+        incomplete message.
+        """
+        # One reverse scan finds the end of the last complete message
+        last = self._rxbuf.rfind(b'\n', scan_off, end)
+        if last < 0:
+            return 0, None, line_start
+        
+        # Copy the complete region out once and split it in a single C call;
+        # this trades per-line memoryview slices for one bulk copy
+        parse = self.parse_data
+        count = 0
+        latest = None
+        for line in self._rxview[line_start:last].tobytes().split(b'\n'):
+            values = parse(line)
+            if values is not None:
+                count += 1
+                latest = values
+        return count, latest, last + 1
     
     def calculate_rate(self):
         """Calculate current data rate"""
-        if len(self.rate_history) < 2:
+        filled = self._ts_filled
+        if filled < 2:
             return 0.0
         
-        time_span = self.rate_history[-1] - self.rate_history[0]
+        # Newest sample sits just before the write index (index -1 wraps),
+        # the oldest at the write index once the ring is full
+        newest = self._ts_i - 1
+        oldest = self._ts_i if filled == RATE_WINDOW else 0
+        time_span = self._ts[newest] - self._ts[oldest]
         if time_span > 0:
-            return (len(self.rate_history) - 1) / time_span
+            return (self._ts_count[newest] - self._ts_count[oldest]) / time_span
         return 0.0
     
     def init_display(self):
@@ -90,74 +253,100 @@ class SmoothSiPhogClient:
             return
             
         # Clear screen once
+        sys.stdout.flush()
         os.system('cls' if os.name == 'nt' else 'clear')
         
-        # Print static header
-        print("╔" + "═" * 58 + "╗")
-        print("║" + " " * 15 + "🔬 SiPhOG Data Monitor" + " " * 20 + "║")
-        print("╠" + "═" * 58 + "╣")
-        print("║ Time:                                                  ║")
-        print("║ Server:                                                ║")
-        print("║ Messages:                    Rate:                     ║")
-        print("╠" + "═" * 58 + "╣")
-        print("║ 📊 LASER & CONTROL:                                    ║")
-        print("║   SLED Current:                                   mA   ║")
-        print("║   SLED Temp:                                      °C   ║")
-        print("║   TEC Current:                                    mA   ║")
-        print("║                                                        ║")
-        print("║ ⚡ OPTICAL POWER:                                      ║")
-        print("║   Photo Current:                                  µA   ║")
-        print("║   SAG Power:                                      V    ║")
-        print("║   Target SAG PWR:                                 V    ║")
-        print("║                                                        ║")
-        print("║ 📈 STATUS: Streaming...                                ║")
-        print("║                                                        ║")
-        print("║ 💡 Press Ctrl+C to stop                               ║")
-        print("╚" + "═" * 58 + "╝")
+        # Print static header in one write
+        if os.name != 'nt':
+            os.write(sys.stdout.fileno(), _HEADER_BYTES)
+        else:
+            sys.stdout.write(_HEADER_TEXT)
+            sys.stdout.flush()
         
         self.display_initialized = True
     
-    def update_field(self, row, col, text, width=None):
-        """Update a specific field without redrawing the whole screen"""
+    def format_field(self, row, col, text, width=None):
+        """Build the escape sequence that redraws a field in place"""
         if width:
             text = f"{text:<{width}}"
         
-        # Move cursor to position and update
-        print(f"\033[{row};{col}H{text}", end="", flush=True)
+        # Move cursor to position and write the text
+        return f"\033[{row};{col}H{text}"
+    
+    def update_field(self, row, col, text, width=None):
+        """Update a specific field without redrawing the whole screen"""
+        if _WIN_CONSOLE:
+            _console_write_at(row, col, f"{text:<{width}}" if width else text)
+            return
+        
+        sys.stdout.write(self.format_field(row, col, text, width))
+        sys.stdout.flush()
     
-    def update_display(self, data):
-        """Update display with new data - no blinking!"""
-        self.data_count += 1
-        current_time = time.time()
-        self.rate_history.append(current_time)
+    def _record(self, count, values, now):
+        """Account for a batch of messages received at time.monotonic() now"""
+        self.data_count += count
+        i = self._ts_i
+        self._ts[i] = now
+        self._ts_count[i] = self.data_count
+        self._ts_i = (i + 1) % RATE_WINDOW
+        if self._ts_filled < RATE_WINDOW:
+            self._ts_filled += 1
+        self._latest = values
+        self._redraw_pending = True
+    
+    def _render(self):
+        """Redraw the display from the latest data - no blinking!"""
+        self._redraw_pending = False
+        self._last_render = time.monotonic()
+        (sled_current, photo_current, sled_temp,
+         target_sag_pwr, sag_pwr, tec_current) = self._latest
         
-        timestamp = datetime.now().strftime("%H:%M:%S.%f")[:-3]
+        # Only format HH:MM:SS when the second changes, then add milliseconds
+        current_time = time.time()  # Wall clock; rate math uses time.monotonic()
+        sec = int(current_time)
+        if sec != self._last_sec:
+            self._last_hms = time.strftime("%H:%M:%S", time.localtime(sec))
+            self._last_sec = sec
+        timestamp = self._last_hms + _MS_SUFFIX[int((current_time - sec) * 1000)]
         rate = self.calculate_rate()
         
-        # Update dynamic fields only
-        self.update_field(4, 8, timestamp, 25)
-        self.update_field(5, 10, f"{self.host}:{self.port}", 25)
-        self.update_field(6, 12, f"{self.data_count}", 15)
-        self.update_field(6, 35, f"{rate:.1f} Hz", 15)
+        # Update status with data quality indicator
+        status = _STATUS[(rate > 10) + (rate > 30)]
         
-        # Update data fields
-        self.update_field(9, 18, f"{data['SLED_Current (mA)']:8.2f}", 15)
-        self.update_field(10, 15, f"{data['SLED_Temp (C)']:8.2f}", 15)
-        self.update_field(11, 17, f"{data['TEC_Current (mA)']:8.2f}", 15)
+        # Field texts in DISPLAY_FIELDS order
+        texts = (
+            timestamp,
+            f"{self.host}:{self.port}",
+            f"{self.data_count}",
+            f"{rate:.1f} Hz",
+            
+            _F2(sled_current),
+            _F2(sled_temp),
+            _F2(tec_current),
+            
+            _F2(photo_current),
+            _F4(sag_pwr),
+            _F4(target_sag_pwr),
+            
+            status,
+        )
         
-        self.update_field(14, 19, f"{data['Photo Current (uA)']:8.2f}", 15)
-        self.update_field(15, 15, f"{data['SAG_PWR (V)']:8.4f}", 15)
-        self.update_field(16, 19, f"{data['Target SAG_PWR (V)']:8.4f}", 15)
+        if _WIN_CONSOLE:
+            for (row, col, width), text in zip(DISPLAY_FIELDS, texts):
+                _console_write_at(row, col, text.ljust(width))
+            return
         
-        # Update status with data quality indicator
-        if rate > 30:
-            status = "🟢 Excellent"
-        elif rate > 10:
-            status = "🟡 Good"
+        # Assemble the whole frame as bytes and emit it as a single write
+        frame = self._frame
+        frame.clear()
+        for (prefix, width), text in zip(FIELD_LAYOUT, texts):
+            frame += prefix
+            frame += text.ljust(width).encode('utf-8')
+        if self._outfd is not None:
+            os.write(self._outfd, frame)
         else:
-            status = "🔴 Slow"
-        
-        self.update_field(18, 16, status, 20)
+            sys.stdout.buffer.write(frame)
+            sys.stdout.buffer.flush()
     
     def run(self):
         """Main client loop with smooth updates"""
@@ -165,57 +354,84 @@ class SmoothSiPhogClient:
             return
         
         self.running = True
-        self.start_time = time.time()
-        buffer = ""
+        self.start_time = time.monotonic()
+        buf = self._rxbuf
+        view = self._rxview
+        write_off = 0   # End of received data
+        line_start = 0  # Start of the first unprocessed message
+        scan_off = 0    # Where the next newline search resumes
         
         # Initialize display
         self.init_display()
+        sys.stdout.flush()  # Frames bypass the text layer from here on
+        
+        # Write frames straight to the fd; on Windows keep the buffered
+        # stream, which handles the console's newline and encoding rules
+        if os.name != 'nt':
+            self._outfd = sys.stdout.fileno()
         
         try:
             while self.running:
                 try:
-                    # Receive data from server
-                    data = self.socket.recv(1024)
-                    if not data:
+                    # Wait for data without raising on every idle tick; with
+                    # a redraw pending, wait no longer than until it is due
+                    timeout = SELECT_TIMEOUT
+                    if self._redraw_pending:
+                        timeout = max(0.0, self._last_render + RENDER_INTERVAL
+                                      - time.monotonic())
+                    if not self.selector.select(timeout=timeout):
+                        # Stream went quiet: show what was received last
+                        if self._redraw_pending:
+                            self._render()
+                        continue
+                    
+                    # Receive data from server straight into the buffer
+                    n = self.socket.recv_into(view[write_off:])
+                    if not n:
+                        if self._redraw_pending:
+                            self._render()
                         self.update_field(18, 16, "❌ Server disconnected", 20)
                         break
+                    write_off += n
+                    
+                    # Process all complete messages received so far in one call
+                    count, latest, line_start = self.parse_all_lines(
+                        line_start, scan_off, write_off)
+                    scan_off = write_off
+                    now = time.monotonic()
+                    if count:
+                        self._record(count, latest, now)
                     
-                    data_str = data.decode('utf-8')
-                    buffer += data_str
+                    # Only redraw at screen rate, however fast data arrives
+                    if self._redraw_pending and now - self._last_render >= RENDER_INTERVAL:
+                        self._render()
                     
-                    # Process complete messages
-                    while '\n' in buffer or ',' in buffer:
-                        if '\n' in buffer:
-                            line, buffer = buffer.split('\n', 1)
+                    # Compact once the consumed part passes half the buffer
+                    if line_start > len(buf) // 2 or write_off == len(buf):
+                        if line_start == 0:
+                            # Full buffer without a newline - not a valid message
+                            write_off = 0
                         else:
-                            parts = buffer.split(',')
-                            if len(parts) >= 6:
-                                line = ','.join(parts[:6])
-                                buffer = ','.join(parts[6:]) if len(parts) > 6 else ""
-                            else:
-                                break
-                        
-                        line = line.strip()
-                        if line and ',' in line:
-                            parsed_data = self.parse_data(line)
-                            if parsed_data:
-                                self.update_display(parsed_data)
+                            write_off -= line_start
+                            buf[:write_off] = buf[line_start:line_start + write_off]
+                        line_start = 0
+                        scan_off = write_off
                     
-                except socket.timeout:
-                    continue
                 except Exception as e:
                     self.update_field(18, 16, f"❌ Error: {str(e)[:15]}", 20)
                     break
                     
         except KeyboardInterrupt:
             # Move cursor below the box for clean exit
-            print(f"\033[22;1H")
+            self.update_field(22, 1, "")
+            print()
             print("🛑 Stopped by user")
         finally:
+            elapsed = max(1e-9, time.monotonic() - self.start_time)
             print(f"\n📊 Session summary:")
             print(f"   Total messages: {self.data_count}")
-            print(f"   Average rate: {self.data_count/max(1, time.time()-self.start_time):.1f} Hz")
-            print(f"   Duration: {time.time()-self.start_time:.1f} seconds")
+            print(f"   Average rate: {self.data_count/elapsed:.1f} Hz")
+            print(f"   Duration: {elapsed:.1f} seconds")
             self.disconnect()
 
 def main():